@@ -2,11 +2,17 @@
 Flask API server for decoy status
 Provides public endpoints for other applications to check decoy status
 """
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.serving import make_server
 from datetime import datetime
+import hmac
 import os
 from shared_state import decoy_status_manager
+import diagnostics
+from loop_monitor import loop_lag_monitor
+from rate_limit import TokenBucketLimiter, ResponseCache, retry_after_header
 
 # Create Flask app
 app = Flask(__name__)
@@ -15,6 +21,80 @@ CORS(app)  # Enable CORS for all routes
 # Configuration
 API_PORT = int(os.getenv('API_PORT', '5000'))
 API_HOST = os.getenv('API_HOST', '0.0.0.0')
+DEBUG_TOKEN = os.getenv('DEBUG_TOKEN')  # /debug endpoints are disabled unless set
+
+# Admission control and micro-cache
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '5'))
+RATE_LIMIT_BURST = float(os.getenv('RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_IDLE_SECONDS = float(os.getenv('RATE_LIMIT_IDLE_SECONDS', '300'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '1'))
+API_KEYS = {key.strip() for key in os.getenv('API_KEYS', '').split(',') if key.strip()}
+# Railway always runs the app behind its proxy, so trust X-Forwarded-For there by default;
+# otherwise every client would share the proxy's rate limit bucket
+TRUST_PROXY = os.getenv('TRUST_PROXY', 'true' if os.getenv('RAILWAY_ENVIRONMENT') else 'false').lower() in ('1', 'true', 'yes')
+CACHED_PATHS = {'/status', '/health', '/info'}
+
+if TRUST_PROXY:
+    # Behind Railway's proxy the client address is in X-Forwarded-For
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, idle_seconds=RATE_LIMIT_IDLE_SECONDS)
+response_cache = ResponseCache(RESPONSE_CACHE_TTL)
+
+def client_key():
+    """Bucket key for the request: a known API key, otherwise the client IP"""
+    api_key = request.headers.get('X-API-Key')
+    if api_key and api_key in API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.remote_addr}"
+
+@app.before_request
+def admit_request():
+    """Rate limit per client and serve cached responses before routing"""
+    if request.method == 'OPTIONS':
+        return None
+    
+    allowed, retry_after = rate_limiter.allow(client_key())
+    if not allowed:
+        response = jsonify({
+            'success': False,
+            'error': 'Rate limit exceeded',
+            'retry_after': round(retry_after, 2),
+            'timestamp': datetime.now().isoformat()
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = retry_after_header(retry_after)
+        return response
+    
+    if request.method == 'GET' and request.path in CACHED_PATHS and RESPONSE_CACHE_TTL > 0:
+        cached = response_cache.get(request.path)
+        if cached is not None:
+            g.cache_hit = True
+            body, status, mimetype = cached
+            return Response(body, status=status, mimetype=mimetype)
+    return None
+
+@app.after_request
+def cache_response(response):
+    """Store fresh /status, /health and /info responses as pre-rendered bytes"""
+    if (request.method == 'GET' and request.path in CACHED_PATHS and RESPONSE_CACHE_TTL > 0
+            and not g.get('cache_hit') and response.status_code == 200):
+        response_cache.put(request.path, response.get_data(), response.status_code, response.mimetype)
+    return response
+
+def debug_access_denied():
+    """Return an error response unless the request carries the debug token"""
+    if not DEBUG_TOKEN:
+        return not_found(None)
+    # Header only: query strings end up in access logs and shell history
+    token = request.headers.get('X-Debug-Token', '')
+    if not hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode()):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or missing debug token',
+            'timestamp': datetime.now().isoformat()
+        }), 403
+    return None
 
 @app.route('/status', methods=['GET'])
 def get_decoy_status():
@@ -54,6 +134,9 @@ def health_check():
         response = {
             'status': health_status,
             'bot_online': bot_online,
+            'role': 'leader' if status_data.get('leader', True) else 'standby',
+            'state': status_data.get('state'),
+            'time_to_ready': status_data.get('time_to_ready'),
             'last_check': last_check,
             'timestamp': datetime.now().isoformat()
         }
@@ -77,18 +160,138 @@ def get_info():
         'endpoints': {
             '/status': 'GET - Get current decoy status',
             '/health': 'GET - Health check',
-            '/info': 'GET - API information'
+            '/info': 'GET - API information',
+            '/metrics/loop': 'GET - Bot event loop lag percentiles',
+            '/metrics/api': 'GET - Rate limiter and cache counters'
+        },
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@app.route('/metrics/loop', methods=['GET'])
+def get_loop_metrics():
+    """Get Discord bot event loop lag percentiles and recent stalls"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': loop_lag_monitor.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/metrics/api', methods=['GET'])
+def get_api_metrics():
+    """Get rate limiter and response cache counters"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'rate_limiter': rate_limiter.get_stats(),
+            'response_cache': response_cache.get_stats()
         },
         'timestamp': datetime.now().isoformat()
     }), 200
 
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Capture a profile of the running process
+
+    format=collapsed (default) samples every thread's stack, format=pstats
+    and format=text run cProfile on the Discord bot's event loop
+    """
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    
+    try:
+        seconds = diagnostics.clamp_seconds(request.args.get('seconds', '5'))
+        output_format = request.args.get('format', 'collapsed')
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        
+        if output_format == 'collapsed':
+            body = diagnostics.collapsed_stacks(diagnostics.sample_all_threads(seconds))
+            filename = f'profile-{stamp}.collapsed.txt'
+            mimetype = 'text/plain'
+        elif output_format in ('pstats', 'text'):
+            stats = diagnostics.profile_event_loop(seconds)
+            if output_format == 'text':
+                return Response(diagnostics.pstats_summary(stats, limit=40), mimetype='text/plain')
+            body = diagnostics.pstats_bytes(stats)
+            filename = f'profile-{stamp}.pstats'
+            mimetype = 'application/octet-stream'
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'format must be one of: collapsed, pstats, text',
+                'timestamp': datetime.now().isoformat()
+            }), 400
+        
+        return Response(body, mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+        
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'seconds must be a number',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    except diagnostics.ProfilerBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 409
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@app.route('/debug/memory', methods=['GET'])
+def debug_memory():
+    """Top tracemalloc allocations and the diff since the previous call"""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    
+    try:
+        if request.args.get('stop') in ('1', 'true'):
+            diagnostics.stop_memory_tracing()
+            data = {'tracing': False}
+        else:
+            data = diagnostics.memory_report(limit=diagnostics.clamp_limit(request.args.get('limit', '20')))
+        
+        return jsonify({
+            'success': True,
+            'data': data,
+            'timestamp': datetime.now().isoformat()
+        }), 200
+        
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit must be an integer',
+            'timestamp': datetime.now().isoformat()
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
     return jsonify({
         'success': False,
         'error': 'Endpoint not found',
-        'available_endpoints': ['/status', '/health', '/info'],
+        'available_endpoints': ['/status', '/health', '/info', '/metrics/loop', '/metrics/api'],
         'timestamp': datetime.now().isoformat()
     }), 404
 
@@ -101,10 +304,13 @@ def internal_error(error):
         'timestamp': datetime.now().isoformat()
     }), 500
 
-def run_api_server():
-    """Run the API server"""
+def run_api_server(ready=None):
+    """Run the API server, setting the ready event once the port is bound"""
     print(f"🚀 Starting API server on {API_HOST}:{API_PORT}")
-    app.run(host=API_HOST, port=API_PORT, debug=False, threaded=True)
+    server = make_server(API_HOST, API_PORT, app, threaded=True)
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
 
 if __name__ == "__main__":
     run_api_server()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Backfill the full target channel history into the local decoy event store
+
+Pages backwards from the newest message, classifies each page and stores
+decoy events together with the oldest and newest processed message IDs. Later
+runs first catch up on messages posted since, then resume backwards, so the
+store can be kept current by rerunning the backfill.
+
+Usage: python backfill.py [--channel ID] [--db PATH] [--page-size N] [--max-messages N] [--restart]
+"""
+import argparse
+import asyncio
+import time
+
+import discord
+
+from config import DISCORD_TOKEN, TARGET_CHANNEL_ID, EVENT_STORE_PATH
+from decoy_patterns import DecoyEvent, classify_decoy_message
+from event_store import DecoyEventStore
+
+# Discord returns at most 100 messages per history request
+MAX_PAGE_SIZE = 100
+
+
+class AdaptivePacer:
+    """Additive-increase/multiplicative-decrease pacing of history requests
+
+    discord.py waits out rate limits inside the request, so a page that
+    takes much longer than usual means we hit one. The delay between
+    requests doubles when that happens and shrinks by a small step after
+    every normal page, settling just under the rate the API allows.
+    """
+
+    def __init__(self, min_delay: float = 0.0, max_delay: float = 30.0,
+                 step: float = 0.05, slow_factor: float = 3.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.step = step
+        self.slow_factor = slow_factor
+        self.delay = min_delay
+        self.typical: float = 0.0  # moving average of unthrottled request time
+        self.throttle_count = 0
+
+    async def wait(self) -> None:
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+
+    def throttled(self) -> None:
+        self.throttle_count += 1
+        self.delay = min(self.max_delay, max(self.delay * 2, 0.25))
+
+    def record(self, elapsed: float) -> None:
+        if self.typical and elapsed > max(1.0, self.slow_factor * self.typical):
+            self.throttled()
+            return
+        self.typical = elapsed if not self.typical else 0.8 * self.typical + 0.2 * elapsed
+        self.delay = max(self.min_delay, self.delay - self.step)
+
+
+def store_page(store, channel_id, self_id, page, forward):
+    """Classify one page of (id, author id, created_at, content) rows and store it"""
+    events = []
+    for message_id, author_id, created_at, content in page:
+        if author_id == self_id:
+            continue
+        decoy_status = classify_decoy_message(content)
+        if decoy_status:
+            events.append((message_id, DecoyEvent(decoy_status, created_at, content)))
+    message_ids = [row[0] for row in page]
+    store.add_batch(channel_id, events,
+                    oldest_message_id=None if forward else min(message_ids),
+                    newest_message_id=max(message_ids),
+                    messages_scanned=len(page))
+    return len(events)
+
+
+async def fetch_pages(channel, cursor_id, forward, page_size, max_messages, pacer, queue):
+    """Page history from cursor_id into queue; return True if the end was reached
+
+    Backwards (forward=False) pages newest-to-oldest before cursor_id, down
+    to the start of the channel. Forwards pages oldest-to-newest after
+    cursor_id, up to the newest message.
+    """
+    cursor = discord.Object(id=cursor_id) if cursor_id else None
+    fetched = 0
+    try:
+        while max_messages is None or fetched < max_messages:
+            limit = page_size if max_messages is None else min(page_size, max_messages - fetched)
+            if forward:
+                history_kwargs = {'after': cursor, 'oldest_first': True}
+            else:
+                history_kwargs = {'before': cursor, 'oldest_first': False}
+            await pacer.wait()
+            started = time.monotonic()
+            try:
+                page = [
+                    (message.id, message.author.id, message.created_at, message.content)
+                    async for message in channel.history(limit=limit, **history_kwargs)
+                ]
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    pacer.throttled()
+                    print(f"⏳ Rate limited, backing off to {pacer.delay:.2f}s between pages")
+                    continue
+                raise
+            pacer.record(time.monotonic() - started)
+
+            if not page:
+                return True
+            fetched += len(page)
+            cursor = discord.Object(id=page[-1][0])
+            # Bounded queue: fetching runs ahead of storage by a few pages at most
+            await queue.put(page)
+            if len(page) < limit:
+                return True
+        return False
+    finally:
+        await queue.put(None)
+
+
+async def store_pages(store, channel_id, self_id, forward, queue, pacer):
+    """Classify and store pages off the event loop as they arrive"""
+    scanned = 0
+    found = 0
+    started = time.monotonic()
+    while True:
+        page = await queue.get()
+        if page is None:
+            return scanned, found
+        found += await asyncio.to_thread(store_page, store, channel_id, self_id, page, forward)
+        scanned += len(page)
+        rate = scanned / max(time.monotonic() - started, 1e-6)
+        print(f"   Scanned {scanned} messages ({rate:.0f}/s), {found} decoy events, "
+              f"{'newest' if forward else 'oldest'} {page[-1][2].strftime('%Y-%m-%d %H:%M:%S')}, "
+              f"delay {pacer.delay:.2f}s")
+
+
+async def crawl(client, channel, store, args, cursor_id, forward, max_messages, pacer):
+    """Run one direction of the crawl; return (reached end, scanned, found)"""
+    queue = asyncio.Queue(maxsize=4)
+    reached_end, (scanned, found) = await asyncio.gather(
+        fetch_pages(channel, cursor_id, forward, args.page_size, max_messages, pacer, queue),
+        store_pages(store, args.channel, client.user.id, forward, queue, pacer)
+    )
+    return reached_end, scanned, found
+
+
+async def run_backfill(client, args):
+    """Crawl the channel history into the event store
+
+    Catches up forwards from the newest stored message first (messages
+    posted since the last run, or while an interrupted run was paused),
+    then continues backwards from the oldest one until the channel start.
+    """
+    store = DecoyEventStore(args.db)
+    try:
+        if args.restart:
+            store.reset_checkpoint(args.channel)
+        oldest_id, newest_id, previously_scanned, complete = store.get_checkpoint(args.channel)
+
+        channel = client.get_channel(args.channel) or await client.fetch_channel(args.channel)
+        pacer = AdaptivePacer()
+        budget = args.max_messages
+        scanned = 0
+        found = 0
+
+        if newest_id:
+            print(f"🔁 Catching up {channel} after message {newest_id} "
+                  f"({previously_scanned} messages already scanned)")
+            caught_up, scanned, found = await crawl(client, channel, store, args, newest_id, True, budget, pacer)
+            if budget is not None:
+                budget -= scanned
+        else:
+            print(f"📥 Starting backfill of {channel}")
+            caught_up = True
+
+        reached_start = complete
+        if not complete and caught_up and (budget is None or budget > 0):
+            if oldest_id:
+                print(f"⏪ Resuming backwards before message {oldest_id}")
+            reached_start, back_scanned, back_found = await crawl(
+                client, channel, store, args, oldest_id, False, budget, pacer)
+            scanned += back_scanned
+            found += back_found
+            if reached_start:
+                store.mark_complete(args.channel)
+
+        done = caught_up and reached_start
+        print(f"{'✅ Backfill complete' if done else '⏸️ Backfill paused'}: "
+              f"scanned {scanned} messages, found {found} decoy events, "
+              f"{store.count_events(args.channel)} events stored, {pacer.throttle_count} rate limit backoffs")
+        recent = store.recent_events(args.channel, limit=5)
+        if recent:
+            print("Most recent stored decoy events:")
+            for i, event in enumerate(recent):
+                print(f"{i+1}. [{event.time.strftime('%Y-%m-%d %H:%M:%S')}] {event.status} - {event.content}")
+    finally:
+        store.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill decoy events from the full channel history")
+    parser.add_argument('--channel', type=int, default=TARGET_CHANNEL_ID, help="Channel ID to crawl")
+    parser.add_argument('--db', default=EVENT_STORE_PATH, help="SQLite event store path")
+    parser.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE,
+                        help=f"Messages per history request (max {MAX_PAGE_SIZE})")
+    parser.add_argument('--max-messages', type=int, default=None,
+                        help="Stop after this many messages; rerun to continue")
+    parser.add_argument('--restart', action='store_true', help="Forget the checkpoint and crawl the whole channel again")
+    args = parser.parse_args(argv)
+    args.page_size = max(1, min(args.page_size, MAX_PAGE_SIZE))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        intents = discord.Intents.default()
+        intents.members = False
+        intents.presences = False
+        client = discord.Client(intents=intents, chunk_guilds_at_startup=False)
+    except Exception:
+        client = discord.Client(chunk_guilds_at_startup=False)
+
+    @client.event
+    async def on_ready():
+        try:
+            await run_backfill(client, args)
+        except Exception as e:
+            print(f"❌ Backfill error: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            await client.close()
+
+    try:
+        client.run(DISCORD_TOKEN)
+    except KeyboardInterrupt:
+        print("\n🛑 Backfill interrupted; rerun to resume from the checkpoint")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Decoy Status Bot
+Starts main.py, then measures how long until the API answers and how long
+until /health reports the status as ready (time to first correct status)
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+def measure_startup(base_url="http://localhost:5000", timeout=120, poll_interval=0.05):
+    """Start main.py once and return (seconds to API up, seconds to ready, reported time_to_ready)"""
+    # Polling every 50ms would trip the rate limiter and read cached /health
+    # responses, delaying the measured ready time by up to a second
+    env = dict(os.environ, RATE_LIMIT_PER_SECOND='0', RESPONSE_CACHE_TTL='0')
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env
+    )
+    api_up = None
+    ready = None
+    reported = None
+    try:
+        while time.monotonic() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"main.py exited with code {process.returncode}")
+            try:
+                data = requests.get(f"{base_url}/health", timeout=1).json()
+                if api_up is None:
+                    api_up = time.monotonic() - started
+                if data.get('state') == 'ready':
+                    ready = time.monotonic() - started
+                    reported = data.get('time_to_ready')
+                    break
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(poll_interval)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return api_up, ready, reported
+
+def run_benchmark(runs=3, base_url="http://localhost:5000"):
+    """Run the startup measurement several times and print a summary"""
+
+    print("⏱️ Startup benchmark")
+    print("=" * 40)
+
+    api_times = []
+    ready_times = []
+    for run in range(1, runs + 1):
+        api_up, ready, reported = measure_startup(base_url)
+        api_text = f"{api_up:.3f}s" if api_up is not None else "timeout"
+        ready_text = f"{ready:.3f}s" if ready is not None else "timeout"
+        print(f"Run #{run}: API up {api_text}, first correct status {ready_text} "
+              f"(bot reported {reported}s)")
+        if api_up is not None:
+            api_times.append(api_up)
+        if ready is not None:
+            ready_times.append(ready)
+        time.sleep(1)  # Let the port free up between runs
+
+    if api_times:
+        print(f"\nAPI up:        best {min(api_times):.3f}s, mean {sum(api_times) / len(api_times):.3f}s")
+    if ready_times:
+        print(f"Status ready:  best {min(ready_times):.3f}s, mean {sum(ready_times) / len(ready_times):.3f}s")
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    run_benchmark(runs)
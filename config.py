@@ -11,13 +11,23 @@ OUTPUT_CHANNEL_ID = int(os.getenv('OUTPUT_CHANNEL_ID', '1415310746174099457'))
 
 # Bot Settings
 CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '5'))
+VERBOSE = os.getenv('VERBOSE', 'false').lower() in ('1', 'true', 'yes')
 
-# Debug: Print all environment variables
-print("🔍 Environment Variables Debug:")
-print(f"   DISCORD_TOKEN: {'SET' if DISCORD_TOKEN else 'NOT SET'}")
-print(f"   TARGET_CHANNEL_ID: {os.getenv('TARGET_CHANNEL_ID', 'NOT SET')}")
-print(f"   OUTPUT_CHANNEL_ID: {os.getenv('OUTPUT_CHANNEL_ID', 'NOT SET')}")
-print(f"   CHECK_INTERVAL: {os.getenv('CHECK_INTERVAL', 'NOT SET')}")
+# Discord user IDs allowed to run !profile (comma-separated); empty disables the command
+PROFILE_ALLOWED_USER_IDS = {int(user_id) for user_id in os.getenv('PROFILE_ALLOWED_USER_IDS', '').split(',') if user_id.strip()}
+
+# Event loop lag monitoring
+LOOP_LAG_INTERVAL_MS = int(os.getenv('LOOP_LAG_INTERVAL_MS', '100'))
+LOOP_BLOCK_THRESHOLD_MS = int(os.getenv('LOOP_BLOCK_THRESHOLD_MS', '250'))
+
+# Local SQLite store for backfilled decoy events
+EVENT_STORE_PATH = os.getenv('EVENT_STORE_PATH', 'decoy_events.db')
+
+# High availability (active/standby) settings
+HA_BACKEND = os.getenv('HA_BACKEND', 'none')
+HA_LEASE_PATH = os.getenv('HA_LEASE_PATH', 'decoy_bot.lease')
+HA_LEASE_TTL = float(os.getenv('HA_LEASE_TTL', '2'))
+INSTANCE_ID = os.getenv('INSTANCE_ID')
 
 # Validate required variables
 if not DISCORD_TOKEN:
@@ -28,7 +38,20 @@ if not DISCORD_TOKEN:
             print(f"   {key}: {value}")
     raise ValueError("DISCORD_TOKEN environment variable is required!")
 
-print(f"✅ Bot configured:")
-print(f"   Target Channel: {TARGET_CHANNEL_ID}")
-print(f"   Output Channel: {OUTPUT_CHANNEL_ID}")
-print(f"   Check Interval: {CHECK_INTERVAL} seconds")
+def print_config():
+    """Print the loaded configuration; called once at bot startup rather than on import"""
+    if VERBOSE:
+        print("🔍 Environment Variables Debug:")
+        print(f"   DISCORD_TOKEN: {'SET' if DISCORD_TOKEN else 'NOT SET'}")
+        print(f"   TARGET_CHANNEL_ID: {os.getenv('TARGET_CHANNEL_ID', 'NOT SET')}")
+        print(f"   OUTPUT_CHANNEL_ID: {os.getenv('OUTPUT_CHANNEL_ID', 'NOT SET')}")
+        print(f"   CHECK_INTERVAL: {os.getenv('CHECK_INTERVAL', 'NOT SET')}")
+        print(f"   VERBOSE: {os.getenv('VERBOSE', 'NOT SET')}")
+        print(f"   HA_BACKEND: {os.getenv('HA_BACKEND', 'NOT SET')}")
+    
+    print(f"✅ Bot configured:")
+    print(f"   Target Channel: {TARGET_CHANNEL_ID}")
+    print(f"   Output Channel: {OUTPUT_CHANNEL_ID}")
+    print(f"   Check Interval: {CHECK_INTERVAL} seconds")
+    print(f"   Verbose: {VERBOSE}")
+    print(f"   HA Backend: {HA_BACKEND}")
@@ -0,0 +1,30 @@
+"""
+Decoy status message patterns and classification
+Shared by the live bot and the history backfill
+"""
+import re
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+# Patterns for decoy status detection - EXACT matches only
+DECOY_ON_PATTERNS = [
+    re.compile(r"Server: Decoy check in progress\. Do not hit decoy npcs \(\d+ min\. remaining\)", re.IGNORECASE)
+]
+
+DECOY_OFF_PATTERNS = [
+    re.compile(r"Server: Decoy check complete\. thank you \^\^", re.IGNORECASE)
+]
+
+class DecoyEvent(NamedTuple):
+    """A decoy status message seen in the target channel"""
+    status: str
+    time: datetime
+    content: str
+
+def classify_decoy_message(content: str) -> Optional[str]:
+    """Return "ON"/"OFF" if content is a decoy status message, else None"""
+    if any(pattern.search(content) for pattern in DECOY_ON_PATTERNS):
+        return "ON"
+    if any(pattern.search(content) for pattern in DECOY_OFF_PATTERNS):
+        return "OFF"
+    return None
@@ -0,0 +1,189 @@
+"""
+On-demand profiling and memory diagnostics for the running bot
+Used by the /debug API endpoints and the !profile bot command
+"""
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional
+
+MAX_PROFILE_SECONDS = 60
+SAMPLE_INTERVAL = 0.005  # 200 Hz stack sampling
+TRACEMALLOC_FRAMES = 10
+MAX_MEMORY_ENTRIES = 100
+
+# Event loop of the Discord bot, registered from on_ready
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Only one profile may run at a time; cProfile can't nest on a thread
+_profile_lock = threading.Lock()
+
+# Previous tracemalloc snapshot, used for diffs between calls
+_memory_lock = threading.Lock()
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+def register_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Remember the bot's event loop so other threads can profile it"""
+    global _event_loop
+    _event_loop = loop
+
+
+def clamp_seconds(seconds: float) -> float:
+    """Keep a requested profile duration within sane bounds"""
+    return max(0.1, min(float(seconds), MAX_PROFILE_SECONDS))
+
+
+def clamp_limit(limit) -> int:
+    """Keep a requested number of memory report entries within sane bounds"""
+    return max(1, min(int(limit), MAX_MEMORY_ENTRIES))
+
+
+async def _run_cprofile(seconds: float) -> cProfile.Profile:
+    # cProfile hooks the current thread, so everything the loop runs while
+    # we sleep (on_message, periodic checks, HTTP callbacks) is recorded
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    return profiler
+
+
+async def profile_event_loop_async(seconds: float) -> pstats.Stats:
+    """Profile the running event loop with cProfile (call from the loop)"""
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        profiler = await _run_cprofile(clamp_seconds(seconds))
+    finally:
+        _profile_lock.release()
+    return pstats.Stats(profiler)
+
+
+def profile_event_loop(seconds: float) -> pstats.Stats:
+    """Profile the bot's event loop with cProfile from another thread"""
+    if _event_loop is None or not _event_loop.is_running():
+        raise RuntimeError("Discord bot event loop is not running")
+    seconds = clamp_seconds(seconds)
+    future = asyncio.run_coroutine_threadsafe(profile_event_loop_async(seconds), _event_loop)
+    return future.result(timeout=seconds + 10)
+
+
+def sample_all_threads(seconds: float, interval: float = SAMPLE_INTERVAL) -> Counter:
+    """Sample every thread's stack and count identical stacks
+
+    Covers the bot thread and the Flask request threads alike. Keys are
+    root-first stacks joined by ';', prefixed with the thread name.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        counts: Counter = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + clamp_seconds(seconds)
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stack.reverse()
+                counts[';'.join(stack)] += 1
+            time.sleep(interval)
+        return counts
+    finally:
+        _profile_lock.release()
+
+
+def collapsed_stacks(counts: Counter) -> bytes:
+    """Render stack counts in collapsed format for flamegraph.pl/speedscope"""
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common()).encode()
+
+
+def pstats_bytes(stats: pstats.Stats) -> bytes:
+    """Serialize stats in the same format as pstats.Stats.dump_stats"""
+    return marshal.dumps(stats.stats)
+
+
+def pstats_summary(stats: pstats.Stats, limit: int = 15) -> str:
+    """Top functions by cumulative time as plain text"""
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+def memory_report(limit: int = 20) -> Dict[str, Any]:
+    """Top allocations and the diff against the previous call
+
+    The first call starts tracemalloc; allocations made before that are
+    not tracked.
+    """
+    global _last_snapshot
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _last_snapshot = None
+            return {
+                'tracing': True,
+                'message': 'tracemalloc started; call again to get allocations',
+                'top': [],
+                'diff': []
+            }
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+
+        top = [{
+            'location': str(stat.traceback[0]),
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count
+        } for stat in snapshot.statistics('lineno')[:limit]]
+
+        diff = []
+        if _last_snapshot is not None:
+            diff = [{
+                'location': str(stat.traceback[0]),
+                'size_diff_kb': round(stat.size_diff / 1024, 1),
+                'count_diff': stat.count_diff
+            } for stat in snapshot.compare_to(_last_snapshot, 'lineno')[:limit]]
+        _last_snapshot = snapshot
+
+        return {
+            'tracing': True,
+            'current_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'top': top,
+            'diff': diff
+        }
+
+
+def stop_memory_tracing() -> None:
+    """Stop tracemalloc and drop the stored snapshot"""
+    global _last_snapshot
+    with _memory_lock:
+        tracemalloc.stop()
+        _last_snapshot = None
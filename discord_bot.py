@@ -1,21 +1,55 @@
-import re
+import io
+import signal
 import discord
 import asyncio
 from datetime import datetime, timedelta
-from config import DISCORD_TOKEN, TARGET_CHANNEL_ID, OUTPUT_CHANNEL_ID, CHECK_INTERVAL
+from typing import Optional
+from config import (print_config, DISCORD_TOKEN, TARGET_CHANNEL_ID, OUTPUT_CHANNEL_ID, CHECK_INTERVAL, VERBOSE,
+                    HA_BACKEND, HA_LEASE_PATH, HA_LEASE_TTL, INSTANCE_ID,
+                    LOOP_LAG_INTERVAL_MS, LOOP_BLOCK_THRESHOLD_MS, PROFILE_ALLOWED_USER_IDS)
 from shared_state import decoy_status_manager
+from decoy_patterns import DECOY_ON_PATTERNS, DECOY_OFF_PATTERNS, DecoyEvent, classify_decoy_message
+from leader_election import LeaderElector, create_backend
+import diagnostics
+from loop_monitor import loop_lag_monitor
 
-# Patterns for decoy status detection - EXACT matches only
-DECOY_ON_PATTERNS = [
-    re.compile(r"Server: Decoy check in progress\. Do not hit decoy npcs \(\d+ min\. remaining\)", re.IGNORECASE)
-]
+# How far back check_recent_messages looks when nothing stops the scan earlier
+RECENT_HISTORY_LIMIT = 200
 
-DECOY_OFF_PATTERNS = [
-    re.compile(r"Server: Decoy check complete\. thank you \^\^", re.IGNORECASE)
-]
+# Newest decoy event we know about; lets periodic checks stop early
+latest_decoy_event: Optional[DecoyEvent] = None
 
 # Initialize shared state
 decoy_status_manager.set_check_interval(CHECK_INTERVAL)
+loop_lag_monitor.interval = LOOP_LAG_INTERVAL_MS / 1000
+loop_lag_monitor.block_threshold = LOOP_BLOCK_THRESHOLD_MS / 1000
+
+def on_leadership_change(leader):
+    """Called from the election thread when this instance gains or loses the lease"""
+    decoy_status_manager.set_leader(leader)
+    if leader and bot_loop is not None:
+        # Publish the warm state right away so the feed doesn't wait for the next change
+        asyncio.run_coroutine_threadsafe(publish_status_on_promotion(), bot_loop)
+
+async def publish_status_on_promotion():
+    """Post the current status unless the output channel already shows it"""
+    try:
+        latest = await find_latest_status_message()
+        current_status = decoy_status_manager.get_status()['status']
+        if latest is not None and f"DECOY STATUS: {current_status}" in latest.content:
+            print("Output channel already shows the current status, not reposting")
+            return
+    except Exception as e:
+        print(f"Error checking existing status message: {e}")
+    await create_status_message()
+
+# Active/standby election: only the leader posts to the output channel
+ha_backend = create_backend(HA_BACKEND, HA_LEASE_PATH)
+elector = None
+bot_loop = None
+if ha_backend is not None:
+    elector = LeaderElector(ha_backend, instance_id=INSTANCE_ID, ttl=HA_LEASE_TTL,
+                            renew_interval=HA_LEASE_TTL / 4, on_change=on_leadership_change)
 
 # Use discord.py-self which is designed for self-bots
 # Disable member list scraping to prevent spam warnings
@@ -34,45 +68,75 @@ async def on_ready():
     print(f"Logged in as {client.user}")
     print("Bot is monitoring for decoy status messages...")
     
+    # Let the API profile this loop
+    global bot_loop
+    bot_loop = asyncio.get_running_loop()
+    diagnostics.register_event_loop(bot_loop)
+    
+    # Measure loop lag and catch callbacks that block on_message
+    loop_lag_monitor.start()
+    
     # Set bot as online in shared state
     decoy_status_manager.set_bot_online(True)
     
-    # Initialize with OFF status and current time
-    decoy_status_manager.update_status("OFF", datetime.now())
-    print("Bot initialized with OFF status")
-    
-    # Check recent messages to determine current status
-    await check_recent_messages()
+    # Check recent messages to determine current status; until this succeeds
+    # the API keeps serving the restored last-known status as "warming"
+    if await check_recent_messages():
+        decoy_status_manager.mark_ready()
     
     # Ensure we have at least one status message in the output channel
     # This handles the case where no decoy messages are found
     try:
-        output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
-        if output_channel:
-            # Check if we have any status messages from this bot
-            has_status_message = False
-            async for message in output_channel.history(limit=10):
-                if message.author.id == client.user.id and ("DECOY STATUS" in message.content or "DECOY STATUS UPDATE" in message.content):
-                    has_status_message = True
-                    break
-            
-            # If no status message exists, create one
-            if not has_status_message:
-                print("No existing status message found, creating initial status message...")
-                await create_status_message()
+        # If no status message exists, create one
+        if client.get_channel(OUTPUT_CHANNEL_ID) and await find_latest_status_message() is None:
+            print("No existing status message found, creating initial status message...")
+            await create_status_message()
     except Exception as e:
         print(f"Error ensuring initial status message: {e}")
     
+    # Join the leader election once we're ready to take over the output channel
+    if elector is not None:
+        elector.start()
+    
     # Start the periodic check task
     asyncio.create_task(periodic_decoy_check())
 
+async def find_latest_status_message():
+    """Return this account's newest status message among the last 10 in the output channel"""
+    output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
+    if not output_channel:
+        return None
+    async for message in output_channel.history(limit=10):
+        if message.author.id == client.user.id and ("DECOY STATUS" in message.content or "DECOY STATUS UPDATE" in message.content):
+            return message
+    return None
+
+def install_shutdown_handler():
+    """Release the lease and log out on SIGTERM (sent by Railway on redeploy)
+
+    Must be called from the main thread before client.run.
+    """
+    def handle_sigterm(signum, frame):
+        print("\n🛑 SIGTERM received, shutting down...")
+        decoy_status_manager.set_bot_online(False)
+        if elector is not None:
+            # Hand the lease to the standby now instead of after HA_LEASE_TTL
+            elector.stop()
+        if bot_loop is not None and bot_loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), bot_loop)
+        else:
+            raise SystemExit(0)
+    
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
 async def periodic_decoy_check():
     """Check for decoy status changes periodically"""
     while True:
         try:
             check_interval = decoy_status_manager.get_check_interval()
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Running periodic decoy check (every {check_interval}s)...")
-            await check_recent_messages()
+            if await check_recent_messages():
+                decoy_status_manager.mark_ready()
             await asyncio.sleep(check_interval)
         except Exception as e:
             print(f"Error in periodic check: {e}")
@@ -80,6 +144,8 @@ async def periodic_decoy_check():
 
 async def cleanup_old_status_messages():
     """Clean up old status messages, keeping only the most recent 5"""
+    if not decoy_status_manager.is_leader():
+        return
     try:
         output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
         if not output_channel:
@@ -111,6 +177,9 @@ async def cleanup_old_status_messages():
 
 async def create_status_message():
     """Create a new status message in the output channel with enhanced layout"""
+    if not decoy_status_manager.is_leader():
+        # Standby instance: keep state warm but leave posting to the leader
+        return
     try:
         output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
         if not output_channel:
@@ -158,30 +227,61 @@ async def create_status_message():
         import traceback
         traceback.print_exc()
 
+async def scan_latest_decoy_event(channel, known_event=None, limit=RECENT_HISTORY_LIMIT, sample=None):
+    """Stream channel history newest-first and return the newest decoy event.
+
+    Stops at the first decoy message, or at the first message older than
+    known_event (nothing older can change the answer). Returns a tuple of
+    (event or None, number of messages scanned). If sample is a list, up to
+    5 (time, author, content) tuples are collected into it for debugging.
+    """
+    scanned = 0
+    async for message in channel.history(limit=limit):
+        scanned += 1
+        if message.author.id == client.user.id:
+            continue
+
+        content = message.content
+        message_time = message.created_at
+
+        if known_event is not None and message_time < known_event.time:
+            return known_event, scanned
+
+        if sample is not None and len(sample) < 5:
+            sample.append((message_time, message.author.name, content[:100]))
+
+        decoy_status = classify_decoy_message(content)
+        if decoy_status:
+            return DecoyEvent(decoy_status, message_time, content), scanned
+
+    return None, scanned
+
 async def check_recent_messages(force_update=False):
-    """Check recent messages to determine current decoy status"""
+    """Check recent messages to determine current decoy status
+
+    Returns True once the scan completed, False if the channel couldn't be read.
+    """
+    global latest_decoy_event
     try:
         channel = client.get_channel(TARGET_CHANNEL_ID)
         if not channel:
             print("❌ Could not find target channel")
             print(f"   Looking for channel ID: {TARGET_CHANNEL_ID}")
             print(f"   Available channels: {[f'{c.id}:{c.name}' for c in client.get_all_channels()]}")
-            return
+            return False
             
         print(f"Checking recent messages in channel: {channel.name}")
-        print(f"   Channel ID: {channel.id}")
-        print(f"   Channel type: {channel.type}")
-        
-        # Check if we can read message history
-        try:
-            # Try to get permissions
-            permissions = channel.permissions_for(channel.guild.me)
-            print(f"   Bot permissions: read_messages={permissions.read_messages}, read_message_history={permissions.read_message_history}")
-        except Exception as e:
-            print(f"   Could not check permissions: {e}")
+        if VERBOSE:
+            print(f"   Channel ID: {channel.id}")
+            print(f"   Channel type: {channel.type}")
             
-        message_count = 0
-        decoy_messages_found = 0
+            # Check if we can read message history
+            try:
+                # Try to get permissions
+                permissions = channel.permissions_for(channel.guild.me)
+                print(f"   Bot permissions: read_messages={permissions.read_messages}, read_message_history={permissions.read_message_history}")
+            except Exception as e:
+                print(f"   Could not check permissions: {e}")
         
         # Get current status from shared state
         current_status_data = decoy_status_manager.get_status()
@@ -189,56 +289,27 @@ async def check_recent_messages(force_update=False):
         current_time_str = current_status_data['last_update']
         current_time = datetime.fromisoformat(current_time_str) if current_time_str else None
         
-        # Get last 200 messages to find decoy messages
-        decoy_messages = []  # Store all decoy messages found
-        recent_messages_sample = []  # Store sample of recent messages for debugging
+        # Sample of recent messages for debugging, only collected in verbose mode
+        recent_messages_sample = [] if VERBOSE else None
         
-        async for message in channel.history(limit=200):
-            message_count += 1
-            if message.author.id == client.user.id:
-                continue
-                
-            content = message.content
-            message_time = message.created_at
-            
-            # Store sample of recent messages for debugging
-            if len(recent_messages_sample) < 5:
-                recent_messages_sample.append({
-                    'content': content[:100],
-                    'author': message.author.name,
-                    'time': message_time.strftime('%H:%M:%S')
-                })
-            
-            # Check if this is a decoy message
-            is_decoy_on = any(pattern.search(content) for pattern in DECOY_ON_PATTERNS)
-            is_decoy_off = any(pattern.search(content) for pattern in DECOY_OFF_PATTERNS)
-            
-            if is_decoy_on or is_decoy_off:
-                decoy_messages_found += 1
-                decoy_status = "ON" if is_decoy_on else "OFF"
-                decoy_messages.append({
-                    'content': content,
-                    'time': message_time,
-                    'status': decoy_status
-                })
-                print(f"Found decoy message: [{message_time.strftime('%H:%M:%S')}] {decoy_status} - {content[:100]}...")
+        # A forced update rescans the whole window instead of trusting the known event
+        known_event = None if force_update else latest_decoy_event
+        most_recent, message_count = await scan_latest_decoy_event(
+            channel, known_event=known_event, sample=recent_messages_sample)
         
         # Debug: Show sample of recent messages
         if recent_messages_sample:
             print(f"   Sample of recent messages:")
-            for i, msg in enumerate(recent_messages_sample):
-                print(f"     {i+1}. [{msg['time']}] {msg['author']}: {msg['content']}")
-        else:
+            for i, (msg_time, author, msg_content) in enumerate(recent_messages_sample):
+                print(f"     {i+1}. [{msg_time.strftime('%H:%M:%S')}] {author}: {msg_content}")
+        elif VERBOSE:
             print(f"   No recent messages found in channel")
         
-        # Find the most recent decoy message
-        if decoy_messages:
-            # Sort by time (most recent first)
-            decoy_messages.sort(key=lambda x: x['time'], reverse=True)
-            most_recent = decoy_messages[0]
-            
-            new_status = most_recent['status']
-            new_time = most_recent['time']
+        # Apply the most recent decoy message
+        if most_recent:
+            latest_decoy_event = most_recent
+            new_status = most_recent.status
+            new_time = most_recent.time
             
             # Only update if status changed or this is a forced update
             status_changed = (current_status != new_status or 
@@ -250,8 +321,7 @@ async def check_recent_messages(force_update=False):
                 decoy_status_manager.update_status(new_status, new_time)
                 
                 print(f"\n=== DECOY STATUS {'CHANGED' if current_status != new_status else 'UPDATED'} ===")
-                for i, msg in enumerate(decoy_messages[:3]):  # Show first 3
-                    print(f"{i+1}. [{msg['time'].strftime('%H:%M:%S')}] {msg['status']} - {msg['content']}")
+                print(f"[{new_time.strftime('%H:%M:%S')}] {new_status} - {most_recent.content}")
                 print(f"Current status: {new_status} at {new_time.strftime('%H:%M:%S')}")
                 
                 # Update the status message
@@ -259,7 +329,7 @@ async def check_recent_messages(force_update=False):
             else:
                 print(f"Status unchanged: {current_status} (last check: {current_time.strftime('%H:%M:%S') if current_time else 'Never'})")
         else:
-            print("No decoy messages found in the last 200 messages")
+            print(f"No decoy messages found in the last {message_count} messages")
             # If no decoy messages found, ensure status is OFF and update last check time
             if current_status != "OFF" or force_update:
                 decoy_status_manager.update_status("OFF", datetime.now())
@@ -267,12 +337,15 @@ async def check_recent_messages(force_update=False):
                 # Create initial status message when no decoy messages are found
                 await create_status_message()
         
-        print(f"Checked {message_count} messages, found {decoy_messages_found} decoy messages")
+        print(f"Checked {message_count} messages")
+        decoy_status_manager.record_check()
+        return True
                     
     except Exception as e:
         print(f"Error checking recent messages: {e}")
         import traceback
         traceback.print_exc()
+        return False
 
 async def show_server_messages():
     """Show recent server messages to help identify decoy patterns"""
@@ -329,31 +402,18 @@ async def show_all_decoy_messages():
             if message.author.id == client.user.id:
                 continue
                 
-            content = message.content
-            message_time = message.created_at
-            
-            # Check if this is a decoy message
-            is_decoy_on = any(pattern.search(content) for pattern in DECOY_ON_PATTERNS)
-            is_decoy_off = any(pattern.search(content) for pattern in DECOY_OFF_PATTERNS)
-            
-            if is_decoy_on or is_decoy_off:
-                decoy_status = "ON" if is_decoy_on else "OFF"
-                decoy_messages.append({
-                    'content': content,
-                    'time': message_time,
-                    'status': decoy_status
-                })
-        
-        # Sort by time (most recent first)
-        decoy_messages.sort(key=lambda x: x['time'], reverse=True)
+            # History is yielded newest-first, so the list stays in that order
+            decoy_status = classify_decoy_message(message.content)
+            if decoy_status:
+                decoy_messages.append(DecoyEvent(decoy_status, message.created_at, message.content))
         
         print(f"Found {len(decoy_messages)} decoy messages:")
         for i, msg in enumerate(decoy_messages):
-            print(f"{i+1}. [{msg['time'].strftime('%Y-%m-%d %H:%M:%S')}] {msg['status']} - {msg['content']}")
+            print(f"{i+1}. [{msg.time.strftime('%Y-%m-%d %H:%M:%S')}] {msg.status} - {msg.content}")
             
         if decoy_messages:
             most_recent = decoy_messages[0]
-            print(f"\nMost recent decoy status: {most_recent['status']} at {most_recent['time'].strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"\nMost recent decoy status: {most_recent.status} at {most_recent.time.strftime('%Y-%m-%d %H:%M:%S')}")
             
     except Exception as e:
         print(f"Error showing decoy messages: {e}")
@@ -362,20 +422,18 @@ async def show_all_decoy_messages():
 
 @client.event
 async def on_message(message):
+    global latest_decoy_event
     if message.channel.id != TARGET_CHANNEL_ID or message.author.id == client.user.id:
         return
 
     content = message.content
     message_time = message.created_at
     
-    # Check if this is a decoy ON message
-    is_decoy_on = any(pattern.search(content) for pattern in DECOY_ON_PATTERNS)
-    
-    # Check if this is a decoy OFF message
-    is_decoy_off = any(pattern.search(content) for pattern in DECOY_OFF_PATTERNS)
+    # Check if this is a decoy ON/OFF message
+    new_status = classify_decoy_message(content)
     
     # Update status if we found a decoy message
-    if is_decoy_on or is_decoy_off:
+    if new_status:
         # Get current status from shared state
         current_status_data = decoy_status_manager.get_status()
         current_time_str = current_status_data['last_update']
@@ -383,13 +441,18 @@ async def on_message(message):
         
         # Only update if this message is newer than our current latest
         if current_time is None or message_time > current_time:
-            new_status = "ON" if is_decoy_on else "OFF"
+            latest_decoy_event = DecoyEvent(new_status, message_time, content)
             decoy_status_manager.update_status(new_status, message_time)
             
             # Update the single status message
             print(f"[{message_time.strftime('%H:%M:%S')}] Decoy status changed to {new_status} - Message: {content[:50]}...")
             await create_status_message()
     
+    # Standby instances keep their status warm but leave commands to the leader;
+    # !interval is still applied so the check interval survives a failover
+    if not decoy_status_manager.is_leader() and not content.lower().startswith("!interval"):
+        return
+    
     # Handle manual status check command
     if content.lower() == "!decoy_status":
         print("Status check requested")
@@ -425,7 +488,7 @@ async def on_message(message):
                     decoy_status_manager.set_check_interval(new_interval)
                     print(f"Check interval changed to {new_interval} seconds")
                     output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
-                    if output_channel:
+                    if output_channel and decoy_status_manager.is_leader():
                         await output_channel.send(f"✅ Check interval changed to {new_interval} seconds")
                 else:
                     print("Interval must be between 30 and 600 seconds")
@@ -440,14 +503,14 @@ async def on_message(message):
         print("Cleanup requested")
         await cleanup_old_status_messages()
         output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
-        if output_channel:
+        if output_channel and decoy_status_manager.is_leader():
             await output_channel.send("🧹 Cleaned up old status messages")
     
     # Handle status info command
     elif content.lower() == "!bot_info":
         print("Bot info requested")
         output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
-        if output_channel:
+        if output_channel and decoy_status_manager.is_leader():
             status_data = decoy_status_manager.get_status()
             info_text = f"🤖 **Bot Status**\n"
             info_text += f"• Check interval: {status_data['check_interval']} seconds\n"
@@ -456,7 +519,9 @@ async def on_message(message):
                 last_update = datetime.fromisoformat(status_data['last_update'])
                 info_text += f"• Last update: {last_update.strftime('%Y-%m-%d %H:%M:%S')}\n"
             info_text += f"• API available: Yes\n"
-            info_text += f"• Commands: !decoy_status, !search_decoy, !interval <sec>, !cleanup, !bot_info, !debug"
+            if elector is not None:
+                info_text += f"• Instance: {elector.instance_id} (leader)\n"
+            info_text += f"• Commands: !decoy_status, !search_decoy, !interval <sec>, !cleanup, !bot_info, !debug, !profile [sec]"
             await output_channel.send(info_text)
     
     # Handle debug command
@@ -464,11 +529,55 @@ async def on_message(message):
         print("Debug info requested")
         await check_recent_messages(force_update=True)
         output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
-        if output_channel:
+        if output_channel and decoy_status_manager.is_leader():
             await output_channel.send("🔍 Debug check completed - check console logs for details")
+    
+    # Handle profile command
+    elif content.lower().startswith("!profile"):
+        await run_profile_command(message)
+
+async def run_profile_command(message):
+    """Profile the event loop and post the summary and pstats file"""
+    # The standby would profile its own loop and then discard the result
+    if not decoy_status_manager.is_leader():
+        return
+    
+    # Profiling slows the detection loop, so only allowlisted users may start it
+    if message.author.id not in PROFILE_ALLOWED_USER_IDS:
+        print(f"⚠️ Ignoring !profile from {message.author} (not in PROFILE_ALLOWED_USER_IDS)")
+        return
+    
+    parts = message.content.split()
+    try:
+        seconds = diagnostics.clamp_seconds(parts[1]) if len(parts) == 2 else 10
+    except ValueError:
+        print("Invalid profile duration. Use: !profile <seconds>")
+        return
+    
+    print(f"Profiling event loop for {seconds} seconds...")
+    try:
+        stats = await diagnostics.profile_event_loop_async(seconds)
+    except diagnostics.ProfilerBusyError as e:
+        print(f"⚠️ {e}")
+        return
+    
+    summary = diagnostics.pstats_summary(stats)
+    print(summary)
+    
+    output_channel = client.get_channel(OUTPUT_CHANNEL_ID)
+    if output_channel and decoy_status_manager.is_leader():
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        profile_file = discord.File(io.BytesIO(diagnostics.pstats_bytes(stats)), filename=f"profile-{stamp}.pstats")
+        await output_channel.send(f"📊 Event loop profile ({seconds:g}s), top functions in the attached pstats file", file=profile_file)
 
 if __name__ == "__main__":
+    print_config()
+    decoy_status_manager.restore()
+    install_shutdown_handler()
     try:
         client.run(DISCORD_TOKEN)
     except Exception as e:
         print(f"Error running bot: {e}")
+    finally:
+        if elector is not None:
+            elector.stop()
@@ -0,0 +1,108 @@
+"""
+Local SQLite store for decoy events and backfill checkpoints
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from decoy_patterns import DecoyEvent
+
+
+class DecoyEventStore:
+    """Thread-safe SQLite store of decoy events keyed by Discord message ID"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS decoy_events ("
+                "message_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, "
+                "status TEXT NOT NULL, created_at TEXT NOT NULL, content TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS decoy_events_channel_time "
+                "ON decoy_events (channel_id, created_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS backfill_checkpoints ("
+                "channel_id INTEGER PRIMARY KEY, oldest_message_id INTEGER, newest_message_id INTEGER, "
+                "messages_scanned INTEGER NOT NULL DEFAULT 0, complete INTEGER NOT NULL DEFAULT 0, "
+                "updated_at TEXT NOT NULL)"
+            )
+            # Stores created before newest_message_id existed
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(backfill_checkpoints)")}
+            if 'newest_message_id' not in columns:
+                self._conn.execute("ALTER TABLE backfill_checkpoints ADD COLUMN newest_message_id INTEGER")
+
+    def add_batch(self, channel_id: int, events: Iterable[Tuple[int, DecoyEvent]],
+                  oldest_message_id: Optional[int], newest_message_id: int, messages_scanned: int) -> None:
+        """Store a page of events and advance the checkpoint in one transaction
+
+        Either both land or neither does, so a resumed backfill never skips
+        a page or double-counts it. oldest_message_id may be None for pages
+        crawled forwards, which only move the newest checkpoint.
+        """
+        rows = [(message_id, channel_id, event.status, event.time.isoformat(), event.content)
+                for message_id, event in events]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO decoy_events VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT INTO backfill_checkpoints "
+                "(channel_id, oldest_message_id, newest_message_id, messages_scanned, complete, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?) ON CONFLICT(channel_id) DO UPDATE SET "
+                "oldest_message_id = COALESCE(excluded.oldest_message_id, backfill_checkpoints.oldest_message_id), "
+                "newest_message_id = MAX(COALESCE(backfill_checkpoints.newest_message_id, 0), excluded.newest_message_id), "
+                "messages_scanned = backfill_checkpoints.messages_scanned + excluded.messages_scanned, "
+                "updated_at = excluded.updated_at",
+                (channel_id, oldest_message_id, newest_message_id, messages_scanned, datetime.now().isoformat())
+            )
+
+    def get_checkpoint(self, channel_id: int) -> Tuple[Optional[int], Optional[int], int, bool]:
+        """Return (oldest processed message ID, newest processed message ID, messages scanned, complete)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT oldest_message_id, newest_message_id, messages_scanned, complete "
+                "FROM backfill_checkpoints WHERE channel_id = ?",
+                (channel_id,)
+            ).fetchone()
+        if row is None:
+            return None, None, 0, False
+        return row[0], row[1], row[2], bool(row[3])
+
+    def mark_complete(self, channel_id: int) -> None:
+        """Record that the backfill reached the start of the channel"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE backfill_checkpoints SET complete = 1, updated_at = ? WHERE channel_id = ?",
+                (datetime.now().isoformat(), channel_id)
+            )
+
+    def reset_checkpoint(self, channel_id: int) -> None:
+        """Forget the checkpoint so the next backfill crawls the whole channel again"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM backfill_checkpoints WHERE channel_id = ?", (channel_id,))
+
+    def count_events(self, channel_id: int) -> int:
+        """Number of stored events for a channel"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM decoy_events WHERE channel_id = ?", (channel_id,)
+            ).fetchone()[0]
+
+    def recent_events(self, channel_id: int, limit: int = 10) -> List[DecoyEvent]:
+        """Newest stored events for a channel"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, created_at, content FROM decoy_events WHERE channel_id = ? "
+                "ORDER BY created_at DESC LIMIT ?", (channel_id, limit)
+            ).fetchall()
+        return [DecoyEvent(status, datetime.fromisoformat(created_at), content)
+                for status, created_at, content in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,203 @@
+"""
+Lease-based leader election for running the bot as an active/standby pair
+Both instances watch the target channel and keep shared state warm, but only
+the lease holder posts to the output channel
+"""
+import fcntl
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+
+class LeaseBackend:
+    """Storage for a single named lease shared between instances"""
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        """Take or renew the lease for holder; return True if holder owns it"""
+        raise NotImplementedError
+
+    def release(self, holder: str) -> None:
+        """Give up the lease if holder owns it"""
+        raise NotImplementedError
+
+
+class FileLeaseBackend(LeaseBackend):
+    """Lease stored in a JSON file, guarded by an flock on the same file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _locked(self, update: Callable[[dict], Optional[dict]]) -> dict:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 4096)
+            try:
+                lease = json.loads(raw) if raw else {}
+            except ValueError:
+                lease = {}
+            new_lease = update(lease)
+            if new_lease is not None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, json.dumps(new_lease).encode())
+                lease = new_lease
+            return lease
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        def update(lease):
+            now = time.time()
+            if lease.get('holder') in (None, holder) or lease.get('expires_at', 0) <= now:
+                return {'holder': holder, 'expires_at': now + ttl}
+            return None
+        return self._locked(update).get('holder') == holder
+
+    def release(self, holder: str) -> None:
+        def update(lease):
+            if lease.get('holder') == holder:
+                return {'holder': None, 'expires_at': 0}
+            return None
+        self._locked(update)
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Lease stored in a SQLite table, updated inside an immediate transaction"""
+
+    def __init__(self, path: str, name: str = 'decoy_bot'):
+        self.path = path
+        self.name = name
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lease ("
+                "name TEXT PRIMARY KEY, holder TEXT, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+
+    def try_acquire(self, holder: str, ttl: float) -> bool:
+        conn = self._connect()
+        try:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO lease (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE lease.holder IS NULL OR lease.holder = excluded.holder OR lease.expires_at <= ?",
+                (self.name, holder, now + ttl, now)
+            )
+            row = conn.execute("SELECT holder FROM lease WHERE name = ?", (self.name,)).fetchone()
+            conn.execute("COMMIT")
+            return row is not None and row[0] == holder
+        except sqlite3.OperationalError:
+            # Database busy: let the elector decide whether our lease still holds
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release(self, holder: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE lease SET holder = NULL, expires_at = 0 WHERE name = ? AND holder = ?",
+                (self.name, holder)
+            )
+
+
+class LeaderElector:
+    """Keeps trying to hold the lease in a background thread
+
+    The lease is renewed every renew_interval seconds and expires after ttl,
+    so a standby takes over at most ttl + renew_interval after the leader dies.
+    A renewal that fails with an error keeps leadership until the last
+    successfully renewed lease would have expired.
+    """
+
+    def __init__(self, backend: LeaseBackend, instance_id: Optional[str] = None,
+                 ttl: float = 2.0, renew_interval: float = 0.5,
+                 on_change: Optional[Callable[[bool], None]] = None):
+        self.backend = backend
+        self.instance_id = instance_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_change = on_change
+        self._is_leader = False
+        self._lease_expires_at = 0.0  # monotonic time our last renewed lease runs out
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def tick(self) -> bool:
+        """Run one acquire/renew round and return current leadership"""
+        started = time.monotonic()
+        try:
+            leader = self.backend.try_acquire(self.instance_id, self.ttl)
+            if leader:
+                self._lease_expires_at = started + self.ttl
+        except Exception as e:
+            print(f"⚠️ Leader election error: {e}")
+            # Nobody else can take the lease before it expires, so don't flap
+            leader = self._is_leader and time.monotonic() < self._lease_expires_at
+        if leader != self._is_leader:
+            self._is_leader = leader
+            print(f"👑 Instance {self.instance_id} is now {'LEADER' if leader else 'STANDBY'}")
+            if self.on_change:
+                try:
+                    self.on_change(leader)
+                except Exception as e:
+                    print(f"⚠️ Leadership change callback error: {e}")
+        return leader
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.renew_interval)
+
+    def start(self) -> None:
+        """Start the election thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the election thread and hand the lease over immediately"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.renew_interval * 2)
+            self._thread = None
+        try:
+            self.backend.release(self.instance_id)
+        except Exception as e:
+            print(f"⚠️ Error releasing lease: {e}")
+        was_leader = self._is_leader
+        self._is_leader = False
+        self._lease_expires_at = 0.0
+        if was_leader and self.on_change:
+            try:
+                self.on_change(False)
+            except Exception as e:
+                print(f"⚠️ Leadership change callback error: {e}")
+
+
+def create_backend(kind: str, path: str) -> Optional[LeaseBackend]:
+    """Build a lease backend from its config name; None disables election"""
+    kind = (kind or '').lower()
+    if kind in ('', 'none', 'off'):
+        return None
+    if kind == 'file':
+        return FileLeaseBackend(path)
+    if kind == 'sqlite':
+        return SQLiteLeaseBackend(path)
+    raise ValueError(f"Unknown HA_BACKEND: {kind} (expected none, file or sqlite)")
@@ -0,0 +1,129 @@
+"""
+Event loop lag monitor and blocking-call detector
+Measures how late the bot's event loop runs a scheduled wakeup and captures
+the loop thread's stack when it stays blocked longer than a threshold
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoopLagMonitor:
+    """Thread-safe lag statistics for one asyncio event loop"""
+
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.25,
+                 window: int = 600, max_stalls: int = 20):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)  # lag in seconds, newest last
+        self._stalls = deque(maxlen=max_stalls)
+        self._stall_count = 0
+        self._open_stall: Optional[Dict[str, Any]] = None  # detected, loop not yet resumed
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running loop (call from the loop; safe to repeat)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _measure(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self._lock:
+                self._samples.append(lag)
+                self._heartbeat = now
+                if self._open_stall is not None:
+                    # The loop is running again: record how long the stall really lasted
+                    self._open_stall['blocked_ms'] = max(self._open_stall['blocked_ms'], round(lag * 1000, 1))
+                    self._open_stall['ongoing'] = False
+                    self._open_stall = None
+
+    def _watch(self) -> None:
+        # Runs in its own thread so it can see the loop while it is blocked
+        reported_heartbeat = None
+        while not self._stop.wait(self.block_threshold / 2):
+            with self._lock:
+                heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.block_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<unavailable>'
+            blocked_ms = round(blocked_for * 1000, 1)
+            stall = {
+                'detected_at': datetime.now().isoformat(),
+                'blocked_ms_at_detection': blocked_ms,
+                'blocked_ms': blocked_ms,  # updated to the full duration when the loop resumes
+                'ongoing': True,
+                'stack': stack
+            }
+            with self._lock:
+                self._stalls.append(stall)
+                self._stall_count += 1
+                if self._heartbeat == heartbeat:
+                    self._open_stall = stall
+                else:
+                    # The loop resumed while we formatted the stack; the sample that
+                    # ended the stall is already recorded, so keep the detected duration
+                    stall['ongoing'] = False
+            print(f"🐢 Event loop blocked for at least {blocked_ms}ms (threshold {self.block_threshold * 1000:.0f}ms):\n{stack}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lag percentiles over the recent window and the latest stalls"""
+        with self._lock:
+            samples = sorted(self._samples)
+            stalls = [dict(stall) for stall in self._stalls]
+            stall_count = self._stall_count
+        stats = {
+            'running': self._task is not None and not self._task.done(),
+            'interval_ms': self.interval * 1000,
+            'block_threshold_ms': self.block_threshold * 1000,
+            'samples': len(samples),
+            'lag_ms': None,
+            'stall_count': stall_count,
+            'recent_stalls': stalls
+        }
+        if samples:
+            stats['lag_ms'] = {
+                'p50': round(_percentile(samples, 0.50) * 1000, 2),
+                'p95': round(_percentile(samples, 0.95) * 1000, 2),
+                'p99': round(_percentile(samples, 0.99) * 1000, 2),
+                'max': round(samples[-1] * 1000, 2)
+            }
+        return stats
+
+
+# Global monitor for the Discord bot's event loop
+loop_lag_monitor = LoopLagMonitor()
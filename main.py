@@ -2,41 +2,61 @@
 """
 Main entry point for the Discord Decoy Status Bot with API Server
 This file is used by Railway as a fallback if Procfile is not detected
+
+The API binds first and serves the last known status as "warming"; the
+Discord bot (and discord.py itself) is only imported once the API is up.
 """
 
 import threading
-import time
 from api_server import run_api_server
-from discord_bot import client, DISCORD_TOKEN
 from shared_state import decoy_status_manager
 
+# Upper bound on waiting for the API to bind before starting the bot anyway
+API_READY_TIMEOUT = 10
+
 def run_discord_bot():
     """Run the Discord bot in a separate thread"""
+    elector = None
     try:
         print("🤖 Starting Discord bot...")
-        client.run(DISCORD_TOKEN)
+        import discord_bot  # Deferred: builds the client and loads config
+        elector = discord_bot.elector
+        discord_bot.print_config()
+        discord_bot.install_shutdown_handler()
+        discord_bot.client.run(discord_bot.DISCORD_TOKEN)
     except Exception as e:
         print(f"❌ Discord bot error: {e}")
         decoy_status_manager.set_bot_online(False)
+    finally:
+        # Hand the lease to the standby instead of letting it expire
+        if elector is not None:
+            elector.stop()
 
-def run_api():
+def run_api(ready):
     """Run the API server in a separate thread"""
     try:
         print("🌐 Starting API server...")
-        run_api_server()
+        run_api_server(ready)
     except Exception as e:
         print(f"❌ API server error: {e}")
+        ready.set()  # Don't hold up the bot if the API can't start
 
 if __name__ == "__main__":
     print("🚀 Starting Discord Decoy Status Bot with Public API")
     print("=" * 50)
     
+    # Serve the last known status while the bot warms up
+    if decoy_status_manager.restore():
+        print(f"♻️ Restored last known status: {decoy_status_manager.get_status()['status']}")
+    
     # Start API server in a separate thread
-    api_thread = threading.Thread(target=run_api, daemon=True)
+    api_ready = threading.Event()
+    api_thread = threading.Thread(target=run_api, args=(api_ready,), daemon=True)
     api_thread.start()
     
-    # Give API server time to start
-    time.sleep(2)
+    # Wait until the API is listening rather than sleeping a fixed time
+    if not api_ready.wait(API_READY_TIMEOUT):
+        print("⚠️ API server not ready yet, starting bot anyway")
     
     # Start Discord bot (this will block)
     try:
@@ -0,0 +1,116 @@
+"""
+Per-client admission control and response micro-cache for the public API
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class TokenBucketLimiter:
+    """Thread-safe token bucket per client key
+
+    Buckets live in an OrderedDict kept in last-seen order, so idle clients
+    are evicted from the front in O(1) per entry and the table never grows
+    past max_clients. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: float, idle_seconds: float = 300.0, max_clients: int = 10000):
+        if rate < 0:
+            raise ValueError(f"Rate limit must be >= 0 requests per second (got {rate})")
+        if burst < 1:
+            raise ValueError(f"Rate limit burst must be at least 1 request (got {burst})")
+        self.enabled = rate > 0
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, last_seen]
+        self._allowed = 0
+        self._limited = 0
+        self._evicted = 0
+
+    def allow(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token for key; return (allowed, seconds until a token is available)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self.enabled:
+                self._allowed += 1
+                return True, 0.0
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+            self._evict(now)
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self._allowed += 1
+                return True, 0.0
+            self._limited += 1
+            return False, (1 - bucket[0]) / self.rate
+
+    def _evict(self, now: float) -> None:
+        # Oldest entries first; stop at the first one that is still active
+        while self._buckets:
+            key, (_, last_seen) = next(iter(self._buckets.items()))
+            if now - last_seen < self.idle_seconds and len(self._buckets) <= self.max_clients:
+                break
+            del self._buckets[key]
+            self._evicted += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'allowed': self._allowed,
+                'limited': self._limited,
+                'active_clients': len(self._buckets),
+                'evicted_clients': self._evicted
+            }
+
+
+class ResponseCache:
+    """Pre-rendered response bodies kept for a short TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, bytes, int, str]] = {}  # key -> (expires, body, status, mimetype)
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[bytes, int, str]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._hits += 1
+                return entry[1], entry[2], entry[3]
+            self._misses += 1
+            return None
+
+    def put(self, key: str, body: bytes, status: int, mimetype: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body, status, mimetype)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After must be a whole number of seconds"""
+    return str(max(1, math.ceil(seconds)))
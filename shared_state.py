@@ -3,7 +3,16 @@ Shared state management for Discord bot and API server
 """
 from datetime import datetime
 from typing import Optional, Dict, Any
+import json
+import os
 import threading
+import time
+
+# Where the last known status is saved so a restart can serve it while warming up
+STATUS_CACHE_PATH = os.getenv('STATUS_CACHE_PATH', 'last_status.json')
+
+# Read here rather than from config so the API reports the right role before the bot loads
+HA_ENABLED = os.getenv('HA_BACKEND', 'none').lower() not in ('', 'none', 'off')
 
 class DecoyStatusManager:
     """Thread-safe manager for decoy status state"""
@@ -15,6 +24,11 @@ class DecoyStatusManager:
         self._check_interval: int = 5
         self._last_check_time: Optional[datetime] = None
         self._bot_online: bool = False
+        self._is_leader: bool = not HA_ENABLED  # With HA, standby until the lease is won
+        self._warming: bool = True  # Until the bot's first history scan completes
+        self._started_at: float = time.monotonic()
+        self._time_to_ready: Optional[float] = None
+        self._cache_path: Optional[str] = None
         
     def update_status(self, status: str, message_time: datetime) -> None:
         """Update the decoy status"""
@@ -22,6 +36,54 @@ class DecoyStatusManager:
             self._latest_decoy_status = status
             self._latest_message_time = message_time
             self._last_check_time = datetime.now()
+            cache_path = self._cache_path
+        if cache_path:
+            self._save(cache_path, status, message_time)
+    
+    def _save(self, path: str, status: str, message_time: datetime) -> None:
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'status': status, 'last_update': message_time.isoformat()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not save last known status: {e}")
+    
+    def restore(self, path: str = STATUS_CACHE_PATH) -> bool:
+        """Load the last known status from path and keep saving updates there"""
+        with self._lock:
+            self._cache_path = path
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            status = saved['status']
+            message_time = datetime.fromisoformat(saved['last_update'])
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Could not restore last known status: {e}")
+            return False
+        with self._lock:
+            self._latest_decoy_status = status
+            self._latest_message_time = message_time
+        return True
+    
+    def record_check(self) -> None:
+        """Record that a history scan completed, even if the status didn't change"""
+        with self._lock:
+            self._last_check_time = datetime.now()
+    
+    def mark_ready(self) -> None:
+        """Record that the status now reflects a completed history scan"""
+        with self._lock:
+            if self._warming:
+                self._warming = False
+                self._time_to_ready = time.monotonic() - self._started_at
+    
+    def is_warming(self) -> bool:
+        """Check whether the status is still the restored/default one"""
+        with self._lock:
+            return self._warming
     
     def get_status(self) -> Dict[str, Any]:
         """Get current decoy status"""
@@ -31,7 +93,10 @@ class DecoyStatusManager:
                 'last_update': self._latest_message_time.isoformat() if self._latest_message_time else None,
                 'last_check': self._last_check_time.isoformat() if self._last_check_time else None,
                 'bot_online': self._bot_online,
-                'check_interval': self._check_interval
+                'check_interval': self._check_interval,
+                'leader': self._is_leader,
+                'state': 'warming' if self._warming else 'ready',
+                'time_to_ready': round(self._time_to_ready, 3) if self._time_to_ready is not None else None
             }
     
     def set_bot_online(self, online: bool) -> None:
@@ -39,6 +104,16 @@ class DecoyStatusManager:
         with self._lock:
             self._bot_online = online
     
+    def set_leader(self, leader: bool) -> None:
+        """Set whether this instance owns the output channel"""
+        with self._lock:
+            self._is_leader = leader
+    
+    def is_leader(self) -> bool:
+        """Check whether this instance owns the output channel"""
+        with self._lock:
+            return self._is_leader
+    
     def set_check_interval(self, interval: int) -> None:
         """Set check interval"""
         with self._lock: